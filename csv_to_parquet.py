@@ -0,0 +1,34 @@
+import os
+import sys
+import pyarrow.parquet as pq
+from pyarrow import csv as pacsv
+from telemetry_io import CSV_READ_OPTIONS, CSV_CONVERT_OPTIONS
+
+def convert_to_parquet(csv_file_path, parquet_file_path):
+    """One-off conversion of the raw telemetry CSV to a compressed Parquet file.
+
+    The CSV is streamed block by block, so the whole file never has to fit in memory.
+    It is written to a temp file and only moved into place once complete, since the
+    loaders trust any .parquet newer than the CSV.
+    """
+    print(f"Converting {csv_file_path} -> {parquet_file_path}...")
+    tmp_path = parquet_file_path + ".tmp"
+    try:
+        reader = pacsv.open_csv(csv_file_path, read_options=CSV_READ_OPTIONS, convert_options=CSV_CONVERT_OPTIONS)
+        rows = 0
+        with pq.ParquetWriter(tmp_path, reader.schema, compression='zstd', use_dictionary=True) as writer:
+            for batch in reader:
+                writer.write_batch(batch, row_group_size=500_000)
+                rows += batch.num_rows
+        os.replace(tmp_path, parquet_file_path)
+        print(f"✅ Wrote {rows} rows to {parquet_file_path}")
+        
+    except Exception as e:
+        # Never leave a truncated (but valid-looking) file behind
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        print(f"Error: {e}")
+        sys.exit(1)
+
+# --- UPDATED PATH FOR INDY ---
+csv_path = "indianapolis/R2_indianapolis_motor_speedway_telemetry.csv"
+convert_to_parquet(csv_path, csv_path.replace(".csv", ".parquet"))
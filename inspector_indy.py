@@ -1,45 +1,56 @@
-import os
-import pandas as pd
+from pathlib import Path
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import csv as pacsv
 
 print("🔍 Searching for ANY telemetry files in subfolders...")
 found_any = False
 
-# Walk through all folders to find any CSV with "telemetry" in the name
-for root, dirs, files in os.walk("."):
-    for file in files:
-        # We look for ANY csv that has 'telemetry' in the name
-        if file.endswith(".csv") and "telemetry" in file.lower():
-            found_any = True
-            full_path = os.path.join(root, file)
-            print(f"\n✅ FOUND FILE: {file}")
-            print(f"   Full Path: {full_path}")
-            
-            try:
-                print("   Loading data to calculate sectors...")
-                # Load only the distance column
-                df = pd.read_csv(full_path, usecols=['telemetry_name', 'telemetry_value'])
-                
-                # Filter for distance
-                dist_df = df[df['telemetry_name'] == 'Laptrigger_lapdist_dls']
-                dist_df['value'] = pd.to_numeric(dist_df['telemetry_value'], errors='coerce')
-                
-                print("\n--- Indianapolis Track Statistics ---")
-                print(dist_df['value'].describe())
-                
-                # Get the clean relative path for your config
-                rel_path = os.path.relpath(full_path).replace("\\", "/")
-                print(f"\n👇 COPY THIS PATH FOR YOUR SCRIPTS 👇")
-                print(f'csv_path = "{rel_path}"')
-                
-                # Stop after finding the first valid file to avoid confusion
-                break 
-            except Exception as e:
-                print(f"   ⚠️ Found file but couldn't read it: {e}")
-
-    if found_any:
+# Search all subfolders for ANY csv that has 'telemetry' in the name
+for full_path in Path(".").rglob("*.csv"):
+    if "telemetry" not in full_path.name.lower():
+        continue
+
+    found_any = True
+    print(f"\n✅ FOUND FILE: {full_path.name}")
+    print(f"   Full Path: {full_path}")
+
+    try:
+        print("   Loading data to calculate sectors...")
+        # Load only the two columns we need, straight into Arrow
+        convert_options = pacsv.ConvertOptions(
+            include_columns=['telemetry_name', 'telemetry_value'],
+            column_types={'telemetry_name': pa.string(), 'telemetry_value': pa.float64()}
+        )
+        table = pacsv.read_csv(full_path, convert_options=convert_options)
+
+        # Filter for distance without building a DataFrame
+        mask = pc.equal(table['telemetry_name'], 'Laptrigger_lapdist_dls')
+        values = pc.filter(table['telemetry_value'], mask)
+        min_max = pc.min_max(values)
+        q25, q50, q75 = pc.quantile(values, q=[0.25, 0.5, 0.75]).to_pylist()
+
+        print("\n--- Indianapolis Track Statistics ---")
+        print(f"count    {pc.count(values).as_py()}")
+        print(f"mean     {pc.mean(values).as_py()}")
+        print(f"std      {pc.stddev(values, ddof=1).as_py()}")
+        print(f"min      {min_max['min'].as_py()}")
+        print(f"25%      {q25}")
+        print(f"50%      {q50}")
+        print(f"75%      {q75}")
+        print(f"max      {min_max['max'].as_py()}")
+
+        # Get the clean relative path for your config
+        rel_path = full_path.as_posix()
+        print(f"\n👇 COPY THIS PATH FOR YOUR SCRIPTS 👇")
+        print(f'csv_path = "{rel_path}"')
+
+        # Stop after finding the first valid file to avoid confusion
         break
+    except Exception as e:
+        print(f"   ⚠️ Found file but couldn't read it: {e}")
 
 if not found_any:
     print("\n❌ Still no telemetry files found.")
     print("Here are the files in your current folder:")
-    print(os.listdir("."))
\ No newline at end of file
+    print([p.name for p in Path(".").iterdir()])
@@ -1,3 +1,4 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -63,6 +64,12 @@ SCHEDULE_2026 = {
     }
 }
 
+# Historical laps the user can simulate from (produced by ghost.py / get_live_lap.py)
+BASELINE_LAPS = {
+    'Fastest Lap (ghost_lap.csv)': "ghost_lap.csv",
+    'Average Lap (live_lap.csv)': "live_lap.csv"
+}
+
 # --- Helper Functions ---
 @st.cache_resource
 def load_model():
@@ -73,19 +80,55 @@ def load_model():
     except FileNotFoundError:
         return None, None
 
-def extract_features(lap_df):
-    """Extracts the same features we trained on from a lap dataframe."""
+@st.cache_data
+def load_lap_csv(path, mtime):
+    """Loads only the columns extract_features needs, parsed once per file version (mtime is only a cache key)."""
+    cols = ['speed', 'nmot', 'aps', 'pbrake_f', 'Steering_Angle']
+    return pd.read_csv(path, usecols=cols, dtype={col: 'float32' for col in cols}, engine='c')
+
+def extract_features(lap_df, feature_order):
+    """Extracts the same features we trained on from a lap dataframe, in the model's column order."""
+    # A header-only CSV gives all-NaN features like the old pandas reductions did
+    # (fillna(0) handles them); np.nanmax and the percentages would raise instead
+    if lap_df.empty:
+        return pd.DataFrame(np.nan, index=[0], columns=feature_order)
+    # Pull each column out once and reduce on the raw arrays (NaN-aware, like pandas)
+    speed = lap_df['speed'].to_numpy()
+    rpm = lap_df['nmot'].to_numpy()
+    aps = lap_df['aps'].to_numpy()
+    brake = lap_df['pbrake_f'].to_numpy()
+    steering = np.abs(lap_df['Steering_Angle'].to_numpy())
     lap_features = {
-        'avg_speed': lap_df['speed'].mean(),
-        'max_speed': lap_df['speed'].max(),
-        'avg_rpm': lap_df['nmot'].mean(),
-        'max_rpm': lap_df['nmot'].max(),
-        'avg_throttle': lap_df['aps'].mean(),
-        'percent_full_throttle': (lap_df['aps'] > 95).mean() * 100,
-        'percent_braking': (lap_df['pbrake_f'] > 5).mean() * 100,
-        'avg_steering_angle': lap_df['Steering_Angle'].abs().mean()
+        'avg_speed': np.nanmean(speed),
+        'max_speed': np.nanmax(speed),
+        'avg_rpm': np.nanmean(rpm),
+        'max_rpm': np.nanmax(rpm),
+        'avg_throttle': np.nanmean(aps),
+        'percent_full_throttle': np.count_nonzero(aps > 95) / len(aps) * 100,
+        'percent_braking': np.count_nonzero(brake > 5) / len(brake) * 100,
+        'avg_steering_angle': np.nanmean(steering)
     }
-    return pd.DataFrame([lap_features])
+    return pd.DataFrame([lap_features], columns=feature_order)
+
+@st.cache_data
+def predict_baselines(_model, feature_order, lap_files):
+    """Predicts the Indy lap time of every (label, path, mtime) in lap_files with a single batched model.predict call.
+
+    Returns (predictions, errors), both keyed by label. A lap whose CSV can't be
+    read lands in errors instead, so one bad file never breaks the others.
+    The mtimes are only part of the cache key, so regenerating a lap CSV invalidates the result.
+    """
+    labels, features, errors = [], [], {}
+    for label, path, mtime in lap_files:
+        try:
+            features.append(extract_features(load_lap_csv(path, mtime), feature_order))
+            labels.append(label)
+        except Exception as e:
+            errors[label] = str(e)
+    if not features: return {}, errors
+    
+    features_df = pd.concat(features, ignore_index=True).fillna(0)
+    return dict(zip(labels, _model.predict(features_df))), errors
 
 # --- Main Page Layout ---
 st.title("🔮 Pre-Event Prediction")
@@ -115,22 +158,23 @@ else:
         st.subheader("1. Select Baseline Data")
         lap_to_predict = st.selectbox(
             "Choose a historical lap to simulate:",
-            ('Fastest Lap (ghost_lap.csv)', 'Average Lap (live_lap.csv)')
+            tuple(BASELINE_LAPS)
         )
 
         if st.button("Generate Prediction", type="primary"):
-            if lap_to_predict == 'Fastest Lap (ghost_lap.csv)':
-                lap_df = pd.read_csv("ghost_lap.csv")
-            else:
-                lap_df = pd.read_csv("live_lap.csv")
-                
             with st.spinner(f"Simulating race pace for {selected_track}..."):
-                features_df = extract_features(lap_df)
-                features_df = features_df.fillna(0) 
-                features_df = features_df[model_features]
-                
-                # Base Prediction (Indy Time)
-                raw_prediction = model.predict(features_df)[0]
+                # Base Prediction (Indy Time), the available baselines are predicted once and cached.
+                # Only the selected lap has to load; a missing or unreadable other baseline is skipped
+                baseline_files = tuple(
+                    (label, path, os.path.getmtime(path)) for label, path in BASELINE_LAPS.items() if os.path.exists(path)
+                )
+                predictions, errors = predict_baselines(model, model_features, baseline_files)
+            
+            if lap_to_predict not in predictions:
+                reason = errors.get(lap_to_predict, "file not found, run ghost.py / get_live_lap.py first")
+                st.error(f"Error: Couldn't load '{BASELINE_LAPS[lap_to_predict]}' ({reason}).")
+            else:
+                raw_prediction = predictions[lap_to_predict]
                 
                 # Apply Track Scaling
                 adjusted_prediction = raw_prediction * track_info['length_scale']
@@ -1,16 +1,46 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+import altair as alt
+
+# --- Helper Functions to Load and Prepare Data ---
+def resample_lap(lap_df, columns, grid):
+    """Linearly interpolates each channel of a lap onto the shared time grid (seconds), keeping its dtype.
+
+    NaN samples are skipped and np.interp holds the first/last value beyond
+    the ends of the lap, so the result needs no ffill/bfill pass.
+    """
+    t_src = lap_df['lap_timestamp'].to_numpy()
+    resampled = {}
+    for col in columns:
+        values = lap_df[col].to_numpy() if col in lap_df.columns else np.array([], dtype=np.float32)
+        valid = ~np.isnan(values)
+        if not valid.any():
+            resampled[col] = np.full(len(grid), np.nan, dtype=np.float32)
+            continue
+        resampled[col] = np.interp(grid, t_src[valid], values[valid]).astype(values.dtype, copy=False)
+    return pd.DataFrame(resampled, index=pd.to_timedelta(grid, unit='s'))
+
+def sector_codes(dist, bins):
+    """Int8 sector code per sample for right-closed bins, like pd.cut(...).ffill().bfill().
+
+    Samples off the sector map (<= 0, past the last bin, NaN) take the code of the
+    nearest sample before (or else after) them; -1 only survives if no sample is on the map.
+    """
+    # NaN sorts past the last bin, so it lands off the map with the rest
+    codes = np.searchsorted(bins, dist, side='left') - 1
+    on_map = (codes >= 0) & (codes < len(bins) - 1)
+    return pd.Series(np.where(on_map, codes, np.nan)).ffill().bfill().fillna(-1).to_numpy(np.int8)
 
-# --- Helper Function to Load and Prepare Data ---
 @st.cache_data  # This decorator caches the data so it only loads once
-def load_and_prepare_data(ghost_path, live_path):
+def load_and_prepare_data(ghost_path, live_path, ghost_mtime, live_mtime):
+    # The mtimes are only part of the cache key, so regenerating a lap CSV invalidates it
     try:
-        ghost_df = pd.read_csv(ghost_path)
-        live_df = pd.read_csv(live_path)
-        
-        ghost_base_time = ghost_df['lap_timestamp'].max()
+        # An empty file (e.g. a lap script still writing) has nothing to parse
+        if os.path.getsize(ghost_path) == 0 or os.path.getsize(live_path) == 0:
+            st.warning("A lap file is empty. Re-run ghost.py / get_live_lap.py.")
+            return None, None, None, None, None
         
         # --- UPDATED: Added G-Force columns (accx, accy) ---
         telemetry_cols = [
@@ -19,68 +49,104 @@ def load_and_prepare_data(ghost_path, live_path):
             'VBOX_Lat_Min', 'VBOX_Long_Minutes', 'Laptrigger_lapdist_dls',
             'accx_can', 'accy_can' # <-- NEW COLUMNS FOR G-G PLOT
         ]
+        # float32 halves every pass below; time and GPS stay float64 for precision
+        dtypes = {col: 'float32' for col in telemetry_cols if col not in ('lap_timestamp', 'VBOX_Lat_Min', 'VBOX_Long_Minutes')}
         
-        ghost_df['lap_timestamp'] = pd.to_timedelta(ghost_df['lap_timestamp'], unit='s')
-        live_df['lap_timestamp'] = pd.to_timedelta(live_df['lap_timestamp'], unit='s')
+        ghost_df = pd.read_csv(ghost_path, usecols=lambda col: col in telemetry_cols, dtype=dtypes)
+        live_df = pd.read_csv(live_path, usecols=lambda col: col in telemetry_cols, dtype=dtypes)
         
-        ghost_df = ghost_df.set_index('lap_timestamp')
-        live_df = live_df.set_index('lap_timestamp')
-        
-        # Use .reindex() to ensure all expected columns are present
-        ghost_df = ghost_df.reindex(columns=telemetry_cols[1:])
-        live_df = live_df.reindex(columns=telemetry_cols[1:])
-        
-        combined_index = pd.to_timedelta(np.arange(
-            0, 
-            max(ghost_df.index.max().total_seconds(), live_df.index.max().total_seconds()), 
-            0.01
-        ), unit='s')
-        
-        ghost_resampled = ghost_df.reindex(ghost_df.index.union(combined_index)).interpolate('time').reindex(combined_index)
-        live_resampled = live_df.reindex(live_df.index.union(combined_index)).interpolate('time').reindex(combined_index)
+        ghost_base_time = ghost_df['lap_timestamp'].max()
         
-        ghost_resampled = ghost_resampled.ffill().bfill()
-        live_resampled = live_resampled.ffill().bfill()
+        # One np.interp per channel straight onto the 10 ms grid (missing channels come back as NaN)
+        grid = np.arange(0, max(ghost_base_time, live_df['lap_timestamp'].max()), 0.01)
+        ghost_resampled = resample_lap(ghost_df, telemetry_cols[1:], grid)
+        live_resampled = resample_lap(live_df, telemetry_cols[1:], grid)
         
-        live_resampled['delta'] = (live_resampled['speed'] - ghost_resampled['speed']) / 3600 * 0.01
-        live_resampled['time_delta_cumulative'] = live_resampled['delta'].cumsum()
+        # One fused cumsum on the raw arrays, no intermediate 'delta' column
+        live_speed = live_resampled['speed'].to_numpy(np.float32)
+        ghost_speed = ghost_resampled['speed'].to_numpy(np.float32)
+        live_resampled['time_delta_cumulative'] = np.cumsum((live_speed - ghost_speed) * np.float32(0.01 / 3600))
 
         # --- INDIANAPOLIS SECTORS ---
         # --- OFFICIAL IMS SECTORS (Source: Al Kamel Track Map) ---
         # Converted from inches to meters: S1=1364m, S2=2751m, End=Max
-        bins = [0.0, 1364.3, 2751.2, 6000.0] 
+        bins = np.array([0.0, 1364.3, 2751.2, 6000.0])
         labels = ["Sector 1", "Sector 2", "Sector 3"] # IMS only uses 3 sectors
         
-        ghost_resampled['sector'] = pd.cut(ghost_resampled['Laptrigger_lapdist_dls'], bins=bins, labels=labels, right=True)
-        live_resampled['sector'] = pd.cut(live_resampled['Laptrigger_lapdist_dls'], bins=bins, labels=labels, right=True)
-        
-        ghost_resampled['sector'] = ghost_resampled['sector'].ffill().bfill()
-        live_resampled['sector'] = live_resampled['sector'].ffill().bfill()
+        # Binary search each sample into its sector (int8 code per row, -1 = unknown)
+        ghost_sector = sector_codes(ghost_resampled['Laptrigger_lapdist_dls'].to_numpy(), bins)
+        live_sector = sector_codes(live_resampled['Laptrigger_lapdist_dls'].to_numpy(), bins)
 
-        ghost_sector_times = ghost_resampled.groupby('sector').apply(len) * 0.01
-        live_sector_times = live_resampled.groupby('sector').apply(len) * 0.01
+        # Samples are on a 10 ms grid, so time in sector = sample count * 0.01
+        ghost_sector_times = np.bincount(ghost_sector[ghost_sector >= 0], minlength=len(labels)) * 0.01
+        live_sector_times = np.bincount(live_sector[live_sector >= 0], minlength=len(labels)) * 0.01
         
         sector_analysis_df = pd.DataFrame({
             'Ghost Time (s)': ghost_sector_times,
             'Live Time (s)': live_sector_times
-        })
+        }, index=pd.Index(labels, name='sector'))
+        # bincount(minlength=3) gives every sector a finite time, so there is nothing to dropna()
         sector_analysis_df['Delta (s)'] = sector_analysis_df['Live Time (s)'] - sector_analysis_df['Ghost Time (s)']
-        sector_analysis_df = sector_analysis_df.dropna()
 
-        return ghost_resampled, live_resampled, sector_analysis_df, ghost_base_time
+        # Dense float32 copies for the slider: the grid is uniform, so a time maps
+        # straight to a row number (the DataFrames are only kept for the charts)
+        lookup_cols = telemetry_cols[1:] + ['time_delta_cumulative']
+        lookup = {
+            'cols': lookup_cols,
+            'ghost': ghost_resampled.reindex(columns=lookup_cols).to_numpy(dtype=np.float32),
+            'live': live_resampled.reindex(columns=lookup_cols).to_numpy(dtype=np.float32),
+            'live_sector': live_sector,
+            'sector_labels': labels,
+            'sector_delta': sector_analysis_df['Delta (s)'].to_numpy(np.float32)
+        }
+
+        return ghost_resampled, live_resampled, sector_analysis_df, ghost_base_time, lookup
     
     except FileNotFoundError:
         st.error(f"Error: Make sure 'ghost_lap.csv' and 'live_lap.csv' are in the same folder.")
-        return None, None, None, None
+        return None, None, None, None, None
     except Exception as e:
         st.error(f"An error occurred during data processing: {e}")
-        return None, None, None, None
+        return None, None, None, None, None
+
+def format_readout(now):
+    """Formats one car's current speed/RPM/steering/gear for the comparison table."""
+    return [f"{now['speed']:.1f}", f"{now['nmot']:.0f}", f"{now['Steering_Angle']:.1f}°", f"{now['gear']:.0f}"]
+
+def bar_html(label, value, color):
+    """A static 0-100 progress bar as HTML, so all bars render in a single element."""
+    pct = 0 if pd.isna(value) else min(max(value, 0), 100)
+    return (
+        f"<div style='margin-bottom:0.5rem'>{label}"
+        "<div style='background:#e6e6e6;border-radius:4px;height:0.6rem'>"
+        f"<div style='background:{color};width:{pct:.0f}%;height:100%;border-radius:4px'></div>"
+        "</div></div>"
+    )
+
+@st.cache_resource
+def make_gg_background(ghost_y, ghost_x):
+    """Builds the static layers of the G-G diagram once (ghost trace + 1.5G circle); each tick only adds the live dot."""
+    g_scale = alt.Scale(domain=[-2.5, 2.5])
+    # Plot the Ghost's entire lap trace (grey background)
+    trace = alt.Chart(pd.DataFrame({'lat_g': ghost_y, 'long_g': ghost_x})).mark_circle(
+        size=1, color='lightgray', opacity=0.3, clip=True
+    ).encode(
+        x=alt.X('lat_g:Q', scale=g_scale, title="Lateral G (Turning)"),
+        y=alt.Y('long_g:Q', scale=g_scale, title="Longitudinal G (Accel/Brake)")
+    )
+    # Draw the "1.5G Limit" circle
+    theta = np.linspace(0, 2 * np.pi, 100)
+    limit = alt.Chart(pd.DataFrame({'lat_g': 1.5 * np.cos(theta), 'long_g': 1.5 * np.sin(theta), 'order': np.arange(100)})).mark_line(
+        color='gray', strokeDash=[4, 4]
+    ).encode(x='lat_g:Q', y='long_g:Q', order='order:Q')
+    return trace + limit
 
 # --- Main Application ---
 st.title("🚗 Real-Time Driver Coach (Indianapolis)")
 st.markdown("Comparing the **Fastest Lap** (Ghost) vs. the **Average Lap** (Live Driver)")
 
-ghost, live, sector_analysis, ghost_lap_time = load_and_prepare_data("ghost_lap.csv", "live_lap.csv")
+lap_mtimes = [os.path.getmtime(path) if os.path.exists(path) else None for path in ("ghost_lap.csv", "live_lap.csv")]
+ghost, live, sector_analysis, ghost_lap_time, lookup = load_and_prepare_data("ghost_lap.csv", "live_lap.csv", *lap_mtimes)
 
 if ghost is not None and live is not None:
     
@@ -95,13 +161,11 @@ if ghost is not None and live is not None:
         step=0.1
     )
     
-    current_time_td = pd.to_timedelta(current_time, unit='s')
-    try:
-        ghost_now = ghost.loc[current_time_td]
-        live_now = live.loc[current_time_td]
-    except KeyError:
-        ghost_now = ghost.iloc[ghost.index.get_loc(current_time_td, method='nearest')]
-        live_now = live.iloc[live.index.get_loc(current_time_td, method='nearest')]
+    # 10 ms grid: the nearest sample is just a row number
+    row = min(int(round(current_time * 100)), len(lookup['live']) - 1)
+    ghost_now = dict(zip(lookup['cols'], lookup['ghost'][row].tolist()))
+    live_now = dict(zip(lookup['cols'], lookup['live'][row].tolist()))
+    sector_idx = lookup['live_sector'][row]
 
     time_delta = live_now['time_delta_cumulative']
     
@@ -123,7 +187,8 @@ if ghost is not None and live is not None:
     
     with col_insight:
         st.subheader("💡 Actionable Insight")
-        current_sector = live_now['sector']
+        # -1 means the lap had no usable distance at all
+        current_sector = lookup['sector_labels'][sector_idx] if sector_idx >= 0 else "an unknown sector"
         live_brake = 'pbrake_f' in live_now and live_now['pbrake_f'] > 5
         ghost_brake = 'pbrake_f' in ghost_now and ghost_now['pbrake_f'] > 5
         
@@ -135,8 +200,8 @@ if ghost is not None and live is not None:
             st.warning(f"**Instant Feedback:** Ghost is full throttle in {current_sector}, but you are not. **Apply more throttle!**")
         elif live_now['speed'] < (ghost_now['speed'] - 5):
             st.warning(f"**Instant Feedback:** Speed is {ghost_now['speed'] - live_now['speed']:.0f} km/h slower than ghost.")
-        elif pd.notna(current_sector):
-            sector_delta = sector_analysis.loc[current_sector]['Delta (s)']
+        elif sector_idx >= 0:
+            sector_delta = lookup['sector_delta'][sector_idx]
             if sector_delta > 0.1:
                 st.info(f"**Sector Summary:** You lost {sector_delta:.2f}s in {current_sector}.")
             elif sector_delta < -0.1:
@@ -153,69 +218,49 @@ if ghost is not None and live is not None:
     
     with col_map:
         st.subheader("🛰️ Live Track Position")
-        map_data = pd.DataFrame({
-            'lat': [ghost_now['VBOX_Lat_Min'], live_now['VBOX_Lat_Min']],
-            'lon': [ghost_now['VBOX_Long_Minutes'], live_now['VBOX_Long_Minutes']]
-        })
-        map_data = map_data.dropna()
-        if not map_data.empty:
-            st.map(map_data, zoom=14, use_container_width=True) 
+        positions = np.array([
+            [ghost_now['VBOX_Lat_Min'], ghost_now['VBOX_Long_Minutes']],
+            [live_now['VBOX_Lat_Min'], live_now['VBOX_Long_Minutes']]
+        ])
+        has_gps = ~np.isnan(positions).any(axis=1)
+        if has_gps.any():
+            st.map(pd.DataFrame(positions[has_gps], columns=['lat', 'lon']), zoom=14, use_container_width=True) 
         else:
             st.warning("GPS data not available.")
 
     # --- NEW: G-G FRICTION CIRCLE ---
     with col_gg:
         st.subheader("🎯 G-G Diagram")
-        # Create figure
-        fig, ax = plt.subplots(figsize=(4, 4))
-        # Draw the "1.5G Limit" circle
-        circle = plt.Circle((0, 0), 1.5, color='gray', fill=False, linestyle='--')
-        ax.add_artist(circle)
-        # Plot the Ghost's entire lap trace (grey background)
-        ax.scatter(ghost['accy_can'], ghost['accx_can'], s=1, color='lightgray', alpha=0.3)
+        # ~2000 background points look the same at s=1 and keep the cache key small
+        gg_stride = max(1, len(ghost) // 2000)
+        background = make_gg_background(
+            ghost['accy_can'].to_numpy()[::gg_stride], ghost['accx_can'].to_numpy()[::gg_stride]
+        )
         # Plot the Live Driver's CURRENT position (red dot)
-        ax.scatter(live_now['accy_can'], live_now['accx_can'], s=100, color='red', edgecolors='black', label='Live')
-        
-        ax.set_xlim(-2.5, 2.5)
-        ax.set_ylim(-2.5, 2.5)
-        ax.set_xlabel("Lateral G (Turning)")
-        ax.set_ylabel("Longitudinal G (Accel/Brake)")
-        ax.grid(True, linestyle=':', alpha=0.6)
-        ax.set_aspect('equal')
-        st.pyplot(fig)
+        live_dot = alt.Chart(pd.DataFrame({'lat_g': [live_now['accy_can']], 'long_g': [live_now['accx_can']]})).mark_point(
+            size=100, color='red', stroke='black', filled=True, clip=True
+        ).encode(x='lat_g:Q', y='long_g:Q')
+        # Rendered client-side by Vega, so a tick ships a small spec instead of a PNG
+        st.altair_chart((background + live_dot).properties(width=300, height=300))
     # --- END NEW SECTION ---
 
     st.divider()
     
     st.subheader("Live Telemetry Comparison")
-    col1, col2 = st.columns(2)
+    # One table + one HTML block instead of a dozen metric/progress widgets per slider tick
+    comparison_df = pd.DataFrame({
+        "👻 Ghost (Fastest Lap)": format_readout(ghost_now),
+        "🚗 Live Driver (Average Lap)": format_readout(live_now)
+    }, index=["Speed (km/h)", "RPM", "Steering", "Gear"])
+    st.dataframe(comparison_df, use_container_width=True)
     
-    with col1:
-        st.subheader("👻 Ghost (Fastest Lap)")
-        g_col1, g_col2 = st.columns(2)
-        g_col1.metric("Speed (km/h)", f"{ghost_now['speed']:.1f}")
-        g_col2.metric("RPM", f"{ghost_now['nmot']:.0f}")
-        g_col1.metric("Steering", f"{ghost_now['Steering_Angle']:.1f}°")
-        g_col2.metric("Gear", f"{ghost_now['gear']:.0f}")
-        
-        st.text("Throttle:")
-        st.progress(int(ghost_now['aps']))
-        st.text("Brake (Front):")
-        st.progress(int(ghost_now['pbrake_f']) if 'pbrake_f' in ghost_now and pd.notna(ghost_now['pbrake_f']) else 0)
-
-
-    with col2:
-        st.subheader("🚗 Live Driver (Average Lap)")
-        l_col1, l_col2 = st.columns(2)
-        l_col1.metric("Speed (km/h)", f"{live_now['speed']:.1f}")
-        l_col2.metric("RPM", f"{live_now['nmot']:.0f}")
-        l_col1.metric("Steering", f"{live_now['Steering_Angle']:.1f}°")
-        l_col2.metric("Gear", f"{live_now['gear']:.0f}")
-
-        st.text("Throttle:")
-        st.progress(int(live_now['aps']))
-        st.text("Brake (Front):")
-        st.progress(int(live_now['pbrake_f']) if 'pbrake_f' in live_now and pd.notna(live_now['pbrake_f']) else 0)
+    st.markdown(
+        "<div style='display:flex;gap:2rem'>"
+        f"<div style='flex:1'>{bar_html('Ghost Throttle', ghost_now['aps'], '#9e9e9e')}{bar_html('Ghost Brake (Front)', ghost_now['pbrake_f'], '#9e9e9e')}</div>"
+        f"<div style='flex:1'>{bar_html('Live Throttle', live_now['aps'], '#eb0a1e')}{bar_html('Live Brake (Front)', live_now['pbrake_f'], '#eb0a1e')}</div>"
+        "</div>",
+        unsafe_allow_html=True
+    )
         
     st.divider()
     
@@ -231,7 +276,9 @@ if ghost is not None and live is not None:
     speed_chart_df.index = speed_chart_df.index.total_seconds()
     speed_chart_df.index.name = "Time (s)"
     
-    st.line_chart(speed_chart_df, use_container_width=True)
+    # ~2000 points is already more than the chart has pixels; keeps the Vega payload small
+    stride = max(1, len(speed_chart_df) // 2000)
+    st.line_chart(speed_chart_df.iloc[::stride], use_container_width=True)
     st.caption("Speed (km/h) over the full lap (in seconds).")
 
 else:
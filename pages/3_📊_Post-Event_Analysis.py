@@ -1,81 +1,78 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
+from telemetry_io import load_laps, fill_laps
 
 st.set_page_config(page_title="Post-Event Analysis", page_icon="📊", layout="wide")
 
 @st.cache_data
-def load_all_lap_data(csv_file_path, lap_reset_threshold_meters=-3000, min_lap_time_seconds=60):
+def load_all_lap_data(telemetry_path, lap_reset_threshold_meters=-3000, min_lap_time_seconds=60, needed_cols=('speed', 'aps', 'pbrake_f')):
     try:
-        # Load data
-        cols = ['timestamp', 'telemetry_name', 'telemetry_value']
-        df = pd.read_csv(csv_file_path, usecols=cols)
-        
-        # Pivot
-        df_wide = df.pivot_table(index='timestamp', columns='telemetry_name', values='telemetry_value', aggfunc='mean').reset_index()
-        
-        # Time processing
-        df_wide['timestamp_dt'] = pd.to_datetime(df_wide['timestamp'], errors='coerce')
-        df_wide = df_wide.sort_values(by='timestamp_dt')
-        df_wide['time_sec'] = (df_wide['timestamp_dt'].astype(int) / 10**9)
-        
-        # Convert columns
-        numeric_cols = ['Laptrigger_lapdist_dls', 'speed', 'aps', 'pbrake_f']
-        for col in numeric_cols:
-            if col in df_wide.columns: 
-                df_wide[col] = pd.to_numeric(df_wide[col], errors='coerce')
-        
-        # Fill and Clean
-        df_wide = df_wide.ffill().dropna(subset=['time_sec', 'Laptrigger_lapdist_dls'])
+        # Load data and detect laps (shared with the offline scripts).
+        # Only the channels in needed_cols are read back from the wide cache.
+        df_wide, starts, ends, durations, lap_numbers = load_laps(
+            telemetry_path, lap_reset_threshold_meters, min_lap_time_seconds,
+            columns=['time_sec', 'Laptrigger_lapdist_dls', *needed_cols]
+        )
+        if len(durations) == 0: return None, None
         
         # --- OFFICIAL IMS SECTORS (Updated) ---
         # Matches Al Kamel PDF: S1=1364m, S2=2751m, End=Max
-        bins = [0.0, 1364.3, 2751.2, 6000.0]
+        bins = np.array([0.0, 1364.3, 2751.2, 6000.0])
         labels = ["Sector 1", "Sector 2", "Sector 3"]
-        df_wide['sector'] = pd.cut(df_wide['Laptrigger_lapdist_dls'], bins=bins, labels=labels, right=True)
-        
-        # Detect Laps
-        df_wide['dist_diff'] = df_wide['Laptrigger_lapdist_dls'].diff()
-        lap_crossings = df_wide[df_wide['dist_diff'] < lap_reset_threshold_meters]
-        crossing_times = lap_crossings['time_sec'].values
         
-        if len(crossing_times) < 2: return None, None
+        # Sector times for every lap in one grouped pass over plain arrays: tag each
+        # sample with its lap and an int8 sector code ((lo, hi] bins, -1/3 = off the map),
+        # then time in sector = last - first sample of that (lap, sector) group
+        time_sec = df_wide['time_sec'].to_numpy()
+        sector_code = (np.searchsorted(bins, df_wide['Laptrigger_lapdist_dls'].to_numpy(), side='left') - 1).astype(np.int8)
+        lap_idx = np.searchsorted(starts, time_sec, side='right') - 1
+        in_lap = (lap_idx >= 0) & (time_sec < ends[np.clip(lap_idx, 0, None)]) \
+            & (sector_code >= 0) & (sector_code < len(labels))
+        group = lap_idx[in_lap] * len(labels) + sector_code[in_lap]
+        sector_bounds = pd.Series(time_sec[in_lap]).groupby(group).agg(['min', 'max'])
+        sector_times = (sector_bounds['max'] - sector_bounds['min']) \
+            .reindex(range(len(durations) * len(labels)), fill_value=0.0).to_numpy().reshape(-1, len(labels))
         
-        # Extract Laps
-        laps_list = []
-        for i in range(len(crossing_times) - 1):
-            start_t = crossing_times[i]
-            end_t = crossing_times[i+1]
-            duration = end_t - start_t
-            
-            if duration > min_lap_time_seconds:
-                lap_data = df_wide[(df_wide['time_sec'] >= start_t) & (df_wide['time_sec'] < end_t)].copy()
-                
-                # Calculate sector times for this lap
-                sector_times = lap_data.groupby('sector')['time_sec'].apply(lambda x: x.max() - x.min() if len(x) > 0 else 0.0)
-                
-                lap_record = {
-                    'Lap Number': i + 1,
-                    'Lap Time (s)': duration,
-                    'S1': sector_times.get("Sector 1", 0),
-                    'S2': sector_times.get("Sector 2", 0),
-                    'S3': sector_times.get("Sector 3", 0),
-                    'data': lap_data 
-                }
-                laps_list.append(lap_record)
+        # One row per lap; the telemetry itself stays in df_wide and each lap only
+        # keeps its row bounds, so the cached payload doesn't grow with lap count
+        laps_df = pd.DataFrame({
+            'Lap Number': lap_numbers,
+            'Lap Time (s)': durations,
+            'S1': sector_times[:, 0],
+            'S2': sector_times[:, 1],
+            'S3': sector_times[:, 2],
+            'start_row': np.searchsorted(time_sec, starts),
+            'end_row': np.searchsorted(time_sec, ends)
+        })
         
-        return pd.DataFrame(laps_list), df_wide
+        return laps_df, df_wide
 
     except Exception as e:
         st.error(f"Error: {e}")
         return None, None
 
+# Common distance axis for the speed traces (one IMS lap)
+COMMON_DIST = np.linspace(0, 5219, 500, dtype=np.float32)
+
+@st.cache_data
+def lap_speed_trace(_full_telemetry, telemetry_path, start_row, end_row):
+    """Resamples one lap's speed onto COMMON_DIST, cached per (file, lap row bounds)."""
+    # Cut the lap out of the shared frame by its row bounds, filled both ways so
+    # speed has a value even before its first sample in the lap
+    lap_data = fill_laps(_full_telemetry.iloc[start_row:end_row][['Laptrigger_lapdist_dls', 'speed']])
+    # np.interp needs a non-decreasing x; a pit-lane glitch would otherwise scramble the trace
+    dist = np.maximum.accumulate(lap_data['Laptrigger_lapdist_dls'].to_numpy(np.float32))
+    # Normalize distance
+    dist -= dist[0]
+    return np.interp(COMMON_DIST, dist, lap_data['speed'].to_numpy(np.float32)).astype(np.float32)
+
 st.title("📊 Post-Event Analysis")
 st.markdown("Deep-dive analysis into race pace, consistency, and potential performance.")
 
 # --- UPDATED PATH FOR INDY ---
-csv_path = "indianapolis/R2_indianapolis_motor_speedway_telemetry.csv"
-laps_df, full_telemetry = load_all_lap_data(csv_path)
+telemetry_path = "indianapolis/R2_indianapolis_motor_speedway_telemetry.parquet"
+laps_df, full_telemetry = load_all_lap_data(telemetry_path)
 
 if laps_df is not None:
     # --- Key Statistics ---
@@ -92,7 +89,7 @@ if laps_df is not None:
 
     st.subheader("Race Summary")
     c1, c2, c3, c4 = st.columns(4)
-    c1.metric("Fastest Lap", f"{fastest_lap_row['Lap Time (s)']:.3f}s", f"Lap {fastest_lap_row['Lap Number']}")
+    c1.metric("Fastest Lap", f"{fastest_lap_row['Lap Time (s)']:.3f}s", f"Lap {fastest_lap_row['Lap Number']:.0f}")
     c2.metric("Theoretical Best", f"{theoretical_best:.3f}s", f"-{potential_gain:.3f}s potential")
     c3.metric("Average Lap", f"{avg_time:.3f}s")
     c4.metric("Consistency (StdDev)", f"{laps_df['Lap Time (s)'].std():.3f}s")
@@ -102,7 +99,7 @@ if laps_df is not None:
     # --- THE RACE STORY ---
     st.subheader("📖 The Story of the Race")
     st.markdown(f"""
-    * **The Hero Lap:** Lap **{fastest_lap_row['Lap Number']}** was the fastest.
+    * **The Hero Lap:** Lap **{fastest_lap_row['Lap Number']:.0f}** was the fastest.
     * **The 'Ideal' Driver:** By combining your best sectors (Official S1, S2, S3), you could have been **{potential_gain:.2f}s faster**.
     * **Consistency Check:** Standard deviation is **{laps_df['Lap Time (s)'].std():.2f}s**.
     """)
@@ -114,22 +111,14 @@ if laps_df is not None:
     st.markdown("Compare your **Fastest Lap** vs. your **Average Lap** to see where speed is lost.")
     
     # Find specific laps to plot
-    fast_lap_data = fastest_lap_row['data'].copy()
     avg_lap_idx = (laps_df['Lap Time (s)'] - avg_time).abs().idxmin()
-    avg_lap_data = laps_df.loc[avg_lap_idx]['data'].copy()
-    
-    # Normalize distance 
-    fast_lap_data['dist_norm'] = fast_lap_data['Laptrigger_lapdist_dls'] - fast_lap_data['Laptrigger_lapdist_dls'].min()
-    avg_lap_data['dist_norm'] = avg_lap_data['Laptrigger_lapdist_dls'] - avg_lap_data['Laptrigger_lapdist_dls'].min()
-    
-    # Common distance axis
-    common_dist = np.linspace(0, 5219, 500) 
-    
-    fast_speed_interp = np.interp(common_dist, fast_lap_data['dist_norm'], fast_lap_data['speed'])
-    avg_speed_interp = np.interp(common_dist, avg_lap_data['dist_norm'], avg_lap_data['speed'])
+    # Only the path and row bounds key the cache; the shared frame is passed unhashed
+    avg_lap_row = laps_df.loc[avg_lap_idx]
+    fast_speed_interp = lap_speed_trace(full_telemetry, telemetry_path, int(fastest_lap_row['start_row']), int(fastest_lap_row['end_row']))
+    avg_speed_interp = lap_speed_trace(full_telemetry, telemetry_path, int(avg_lap_row['start_row']), int(avg_lap_row['end_row']))
     
     chart_df = pd.DataFrame({
-        'Distance (m)': common_dist,
+        'Distance (m)': COMMON_DIST,
         'Fastest Lap Speed': fast_speed_interp,
         'Average Lap Speed': avg_speed_interp
     }).set_index('Distance (m)')
@@ -0,0 +1,159 @@
+import os
+import functools
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import csv as pacsv
+
+# Every channel we use anywhere in the suite
+NUMERIC_COLS = ['Laptrigger_lapdist_dls', 'Steering_Angle', 'VBOX_Lat_Min', 'VBOX_Long_Minutes', 'accx_can', 'accy_can', 'aps', 'gear', 'nmot', 'pbrake_f', 'pbrake_r', 'speed']
+
+# The long-format columns we read, and how Arrow should type them
+LONG_COLS = ['timestamp', 'telemetry_name', 'telemetry_value']
+LONG_TYPES = {
+    'timestamp': pa.string(),
+    'telemetry_name': pa.dictionary(pa.int32(), pa.string()),
+    # float32 halves the long table, the wide frame is float32 anyway
+    'telemetry_value': pa.float32()
+}
+CSV_READ_OPTIONS = pacsv.ReadOptions(use_threads=True, block_size=64 << 20)
+CSV_CONVERT_OPTIONS = pacsv.ConvertOptions(include_columns=LONG_COLS, column_types=LONG_TYPES)
+
+def read_long(telemetry_path, channels=None):
+    """Reads the long-format telemetry from the raw CSV or its Parquet conversion (see csv_to_parquet.py).
+
+    If channels is given, rows for any other telemetry_name are dropped in
+    Arrow, before a DataFrame is ever built.
+    """
+    if telemetry_path.endswith(".parquet"):
+        channel_filter = ds.field('telemetry_name').isin(channels) if channels is not None else None
+        table = ds.dataset(telemetry_path, format='parquet').to_table(columns=LONG_COLS, filter=channel_filter)
+    else:
+        # Stream the CSV block by block so peak memory is bounded by the kept
+        # rows, not by the whole multi-GB file
+        reader = pacsv.open_csv(telemetry_path, read_options=CSV_READ_OPTIONS, convert_options=CSV_CONVERT_OPTIONS)
+        wanted = pa.array(channels) if channels is not None else None
+        batches = []
+        for batch in reader:
+            if wanted is not None:
+                batch = batch.filter(pc.is_in(batch.column('telemetry_name'), value_set=wanted))
+            batches.append(batch)
+        table = pa.Table.from_batches(batches, schema=reader.schema)
+    # telemetry_name is dictionary encoded, so it comes back as a categorical
+    return table.to_pandas(self_destruct=True)
+
+def load_wide(telemetry_path, columns=None):
+    """Loads the long-format telemetry as a wide (one column per channel) dataframe.
+
+    The pivot is expensive, so the result is cached next to the source as
+    `<name>.wide.parquet` and reused until the source changes.
+    """
+    cache_path = os.path.splitext(telemetry_path)[0] + ".wide.parquet"
+    if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(telemetry_path):
+        print(f"Loading cached pivot from {cache_path}...")
+        return pd.read_parquet(cache_path, columns=columns)
+
+    print(f"Loading data from {telemetry_path}...")
+    df = read_long(telemetry_path, channels=NUMERIC_COLS)
+    print("Pivoting... (This takes a moment)")
+    # Scatter straight into a dense (timestamp x channel) float32 array instead of
+    # going through pandas' pivot machinery. Duplicate samples are averaged first,
+    # per occupied cell (like pivot_table(aggfunc='mean') did), so the only
+    # grid-sized allocation is the float32 result itself.
+    ts_codes, timestamps = pd.factorize(df['timestamp'], sort=True)
+    name_codes = pd.Categorical(df['telemetry_name'], categories=NUMERIC_COLS).codes
+    values = df['telemetry_value'].to_numpy()
+    valid = (ts_codes >= 0) & (name_codes >= 0) & ~np.isnan(values)
+
+    n_cols = len(NUMERIC_COLS)
+    flat = ts_codes[valid] * n_cols + name_codes[valid]
+    cell_codes, cells = pd.factorize(flat)
+    sums = np.bincount(cell_codes, weights=values[valid])
+    counts = np.bincount(cell_codes)
+    wide = np.full(len(timestamps) * n_cols, np.nan, dtype=np.float32)
+    wide[cells] = sums / counts
+    wide = wide.reshape(len(timestamps), n_cols)
+    del df, flat, cell_codes, cells, sums, counts
+
+    df_wide = pd.DataFrame(wide, columns=NUMERIC_COLS)
+    df_wide.insert(0, 'timestamp', timestamps)
+
+    # The feed is always ISO 8601; saying so skips per-value format inference
+    df_wide['timestamp_dt'] = pd.to_datetime(df_wide['timestamp'], format='ISO8601', errors='coerce')
+    # factorize(sort=True) already orders ISO timestamps chronologically, so this is usually a no-op check
+    if not df_wide['timestamp_dt'].is_monotonic_increasing:
+        df_wide = df_wide.sort_values(by='timestamp_dt', kind='mergesort')
+    # View the datetime64 values as int64 nanoseconds, no astype round-trip. Newer pandas
+    # may parse to a coarser unit (us), so pin ns first or time_sec comes out 1000x off
+    df_wide['time_sec'] = df_wide['timestamp_dt'].dt.as_unit('ns').values.view('i8') * 1e-9
+
+    # Lap detection only needs the distance channel filled; the rest is
+    # filled per lap by the callers, on far fewer rows
+    df_wide['Laptrigger_lapdist_dls'] = df_wide['Laptrigger_lapdist_dls'].ffill()
+    # Unparseable timestamps would land out of order in time_sec, so drop them too
+    df_wide = df_wide.dropna(subset=['timestamp_dt', 'Laptrigger_lapdist_dls'])
+
+    df_wide.to_parquet(cache_path, compression='zstd', use_dictionary=True, index=False)
+    print(f"Cached pivot to {cache_path}")
+    if columns is not None:
+        df_wide = df_wide[columns]
+    return df_wide
+
+def find_laps(dist, time_sec, lap_reset_threshold_meters=-3000, min_lap_time_seconds=60):
+    """Finds complete laps from the lap distance and time arrays.
+
+    A lap boundary is a drop in lap distance larger than the reset threshold.
+    Returns (starts, ends, durations, lap_numbers) for every lap longer than
+    min_lap_time_seconds, times in seconds. Lap numbers count every crossing
+    (1-based), so a skipped short lap doesn't renumber the ones after it.
+    """
+    crossing_times = time_sec[1:][np.diff(dist) < lap_reset_threshold_meters]
+    durations = np.diff(crossing_times)
+    valid_mask = durations > min_lap_time_seconds
+    lap_numbers = np.flatnonzero(valid_mask) + 1
+    return crossing_times[:-1][valid_mask], crossing_times[1:][valid_mask], durations[valid_mask], lap_numbers
+
+def load_laps(telemetry_path, lap_reset_threshold_meters=-3000, min_lap_time_seconds=60, columns=None):
+    """Loads the wide telemetry and finds its valid laps in one call.
+
+    Returns (df_wide, starts, ends, durations, lap_numbers). Only the latest
+    result is memoised (keyed on the file's mtime), so a long-running Streamlit
+    server holds at most one extra wide frame; treat df_wide as read-only.
+    """
+    return _load_laps_cached(
+        telemetry_path, os.path.getmtime(telemetry_path),
+        lap_reset_threshold_meters, min_lap_time_seconds,
+        tuple(columns) if columns is not None else None
+    )
+
+@functools.lru_cache(maxsize=1)
+def _load_laps_cached(telemetry_path, mtime, lap_reset_threshold_meters, min_lap_time_seconds, columns):
+    df_wide = load_wide(telemetry_path, columns=list(columns) if columns is not None else None)
+    starts, ends, durations, lap_numbers = find_laps(
+        df_wide['Laptrigger_lapdist_dls'].to_numpy(), df_wide['time_sec'].to_numpy(),
+        lap_reset_threshold_meters, min_lap_time_seconds
+    )
+    return df_wide, starts, ends, durations, lap_numbers
+
+def fill_laps(frame, lap_id=None):
+    """Fills gaps inside each lap, forward and then back for channels not yet sampled at the lap start.
+
+    lap_id groups a multi-lap frame row by row; without it the frame is one lap.
+    Shared by extract_lap and the model trainer so training and inference see the same features.
+    """
+    if lap_id is None: return frame.ffill().bfill()
+    return frame.groupby(lap_id).ffill().groupby(lap_id).bfill()
+
+def extract_lap(df_wide, start, end):
+    """Cuts one lap [start, end) out of df_wide, filled and with a lap-relative 'lap_timestamp'."""
+    # time_sec is sorted, so the lap window is a contiguous row range
+    lo, hi = np.searchsorted(df_wide['time_sec'].to_numpy(), [start, end])
+    # Channels rarely share a timestamp, so most start the lap unsampled and are
+    # seeded from their first in-lap sample. The fill already returns a new frame,
+    # so no extra copy() is needed to add a column
+    lap = fill_laps(df_wide.iloc[lo:hi])
+    time_sec = lap['time_sec'].to_numpy()
+    lap['lap_timestamp'] = time_sec - time_sec[0]
+    return lap